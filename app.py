@@ -1,17 +1,42 @@
 """Flask backend for Previous Year Question Papers website."""
+import time
+
+_STARTED = time.perf_counter()
+
+import logging
 import os
 import re
+import sys
+import threading
+from contextlib import contextmanager
 from flask import Flask, request, jsonify, send_file, send_from_directory, session
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 
 import database as db
+import storage
+
+# (step, seconds) for each startup phase; see startup_report(). For a
+# per-module import breakdown run: python -X importtime app.py --startup-profile
+STARTUP_PROFILE = [("imports", time.perf_counter() - _STARTED)]
+
+
+@contextmanager
+def _timed(step):
+    t = time.perf_counter()
+    yield
+    STARTUP_PROFILE.append((step, time.perf_counter() - t))
+
 
-app = Flask(__name__, static_folder="static", template_folder="templates")
-app.secret_key = os.urandom(24)
-app.url_map.strict_slashes = False
-CORS(app, supports_credentials=True)
+with _timed("create app"):
+    app = Flask(__name__, static_folder="static", template_folder="templates")
+    app.secret_key = os.urandom(24)
+    app.url_map.strict_slashes = False
+    CORS(app, supports_credentials=True)
+    # Without this the logger inherits WARNING from root and the startup
+    # report below is dropped outside debug mode.
+    if app.logger.level == logging.NOTSET:
+        app.logger.setLevel(logging.INFO)
 
 @app.after_request
 def add_header(response):
@@ -21,8 +46,7 @@ def add_header(response):
     response.headers["Expires"] = "0"
     return response
 
-PDF_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdf")
-os.makedirs(PDF_FOLDER, exist_ok=True)
+PDF_FOLDER = storage.PDF_FOLDER
 
 # Admin credentials (demo)
 ADMIN_USERNAME = "admin"
@@ -32,8 +56,47 @@ ADMIN_PASSWORD = "Admin@1234"
 YEAR_PATTERN = re.compile(r"^\d{4}-\d{2}$")
 
 
+# Served without DB or disk work once the worker is initialised
+HEALTH_ENDPOINTS = {"healthz", "readyz"}
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
 def init_app():
-    db.init_db()
+    """Create the pdf folder and DB schema. Runs once per process, at import."""
+    global _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        with _timed("init_db"):
+            os.makedirs(PDF_FOLDER, exist_ok=True)
+            db.init_db()
+        # get_db() keeps the snapshot current after writes; only build it here
+        # when this is the first start in snapshot mode. Failures are logged by
+        # refresh_snapshot() and do not block readiness: reads fall back to the
+        # primary DB while no snapshot exists.
+        if db.SNAPSHOT_ENABLED and not os.path.exists(db.SNAPSHOT_PATH):
+            with _timed("build snapshot"):
+                db.refresh_snapshot()
+        _initialized = True
+    app.logger.info("Startup profile:\n%s", startup_report())
+
+
+@app.before_request
+def ensure_initialized():
+    if not _initialized and request.endpoint not in HEALTH_ENDPOINTS:
+        init_app()
+
+
+def startup_report():
+    """Human-readable breakdown of STARTUP_PROFILE."""
+    lines = [f"{step:<28}{secs * 1000:9.1f} ms" for step, secs in STARTUP_PROFILE]
+    total = sum(secs for _, secs in STARTUP_PROFILE)
+    lines.append(f"{'total':<28}{total * 1000:9.1f} ms")
+    return "\n".join(lines)
 
 
 # ---------- Auth helpers ----------
@@ -56,6 +119,29 @@ def require_admin():
     return False
 
 
+# ---------- Health probes ----------
+@app.route("/healthz")
+def healthz():
+    """Liveness: the worker is up and serving requests."""
+    return jsonify({"status": "ok"})
+
+
+@app.route("/readyz")
+def readyz():
+    """Readiness: the worker can take traffic (init_app has succeeded).
+
+    Real traffic is not routed to an unready worker, so a failed init_app()
+    is retried here rather than waiting for a request that never comes.
+    """
+    if not _initialized:
+        try:
+            init_app()
+        except Exception:
+            app.logger.exception("init_app failed")
+            return jsonify({"ready": False}), 503
+    return jsonify({"ready": True})
+
+
 # ---------- Student routes (public) ----------
 @app.route("/")
 def index():
@@ -79,7 +165,7 @@ def admin_page():
 
 @app.route("/api/branches")
 def get_branches():
-    with db.get_db() as conn:
+    with db.get_read_db() as conn:
         c = conn.cursor()
         c.execute("SELECT id, name FROM branches ORDER BY name")
         rows = c.fetchall()
@@ -88,7 +174,7 @@ def get_branches():
 
 @app.route("/api/semesters")
 def get_semesters():
-    with db.get_db() as conn:
+    with db.get_read_db() as conn:
         c = conn.cursor()
         c.execute("SELECT id, number FROM semesters ORDER BY number")
         rows = c.fetchall()
@@ -99,7 +185,7 @@ def get_semesters():
 def get_subjects():
     semester_id = request.args.get("semester_id")
     branch_id = request.args.get("branch_id")
-    with db.get_db() as conn:
+    with db.get_read_db() as conn:
         c = conn.cursor()
         if semester_id:
             if branch_id:
@@ -135,7 +221,7 @@ def get_subjects():
 @app.route("/api/years")
 def get_years():
     """Return distinct academic years from uploaded papers."""
-    with db.get_db() as conn:
+    with db.get_read_db() as conn:
         c = conn.cursor()
         c.execute("SELECT DISTINCT academic_year FROM question_papers ORDER BY academic_year DESC")
         rows = c.fetchall()
@@ -153,7 +239,7 @@ def get_papers():
     year = request.args.get("year")
     if not all([branch_id, semester_id, subject_id, year]):
         return jsonify([])
-    with db.get_db() as conn:
+    with db.get_read_db() as conn:
         c = conn.cursor()
         # Find all subject ids with same name (handles duplicates)
         c.execute(
@@ -197,7 +283,7 @@ def get_papers():
 
 @app.route("/api/papers/download/<int:paper_id>")
 def download_paper(paper_id):
-    with db.get_db() as conn:
+    with db.get_read_db() as conn:
         c = conn.cursor()
         c.execute("SELECT file_path FROM question_papers WHERE id = ?", (paper_id,))
         row = c.fetchone()
@@ -523,61 +609,38 @@ def admin_papers():
         return jsonify({"error": "Year must be format 2023-24"}), 400
     if file.filename == "" or not file.filename.lower().endswith(".pdf"):
         return jsonify({"error": "Valid PDF file required"}), 400
-    with db.get_db() as conn:
-        c = conn.cursor()
-        c.execute("SELECT name FROM branches WHERE id = ?", (branch_id,))
-        br = c.fetchone()
-        c.execute("SELECT number FROM semesters WHERE id = ?", (semester_id,))
-        sem = c.fetchone()
-        c.execute("SELECT name FROM subjects WHERE id = ?", (subject_id,))
-        sub = c.fetchone()
-    if not br or not sem or not sub:
-        return jsonify({"error": "Invalid branch/semester/subject"}), 400
-    branch_slug = db.slugify(br["name"])
-    sub_slug = db.slugify(sub["name"])
-    filename = f"{branch_slug}_{sem['number']}_{sub_slug}_{academic_year}.pdf"
-    filename = secure_filename(filename)
-    filepath = os.path.join(PDF_FOLDER, filename)
     try:
-        file.save(filepath)
+        filename = storage.save_paper(file, branch_id, semester_id, subject_id, academic_year, description)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    try:
-        with db.get_db() as conn:
-            c = conn.cursor()
-            c.execute(
-                "INSERT INTO question_papers (branch_id, semester_id, subject_id, academic_year, file_path, description) VALUES (?, ?, ?, ?, ?, ?)",
-                (branch_id, semester_id, subject_id, academic_year, filename, description or None),
-            )
-        return jsonify({"success": True, "file_path": filename})
-    except Exception as e:
-        if os.path.isfile(filepath):
-            os.remove(filepath)
-        return jsonify({"error": str(e)}), 500
+    return jsonify({"success": True, "file_path": filename})
 
 
 @app.route("/api/admin/papers/<int:paper_id>", methods=["DELETE"])
 def admin_delete_paper(paper_id):
     if not require_admin():
         return jsonify({"error": "Unauthorized"}), 401
-    with db.get_db() as conn:
-        c = conn.cursor()
-        c.execute("SELECT file_path FROM question_papers WHERE id = ?", (paper_id,))
-        row = c.fetchone()
-    if not row:
+    try:
+        found = storage.delete_paper(paper_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if not found:
         return jsonify({"error": "Paper not found"}), 404
-    path = os.path.join(PDF_FOLDER, row["file_path"])
-    if os.path.isfile(path):
-        try:
-            os.remove(path)
-        except OSError:
-            pass
-    with db.get_db() as conn:
-        c = conn.cursor()
-        c.execute("DELETE FROM question_papers WHERE id = ?", (paper_id,))
     return jsonify({"success": True})
 
 
-if __name__ == "__main__":
+# Initialise eagerly so probes are cheap and accurate once the worker is up;
+# a failure is retried by /readyz and by ensure_initialized().
+try:
     init_app()
+except Exception:
+    app.logger.exception("init_app failed")
+
+
+if __name__ == "__main__":
+    if "--startup-profile" in sys.argv:
+        print(startup_report())
+        sys.exit(0)
     app.run(debug=True, port=5000)
@@ -1,10 +1,30 @@
 """Database setup and helpers for Previous Year Question Papers."""
+import logging
 import sqlite3
 import os
+import tempfile
+import threading
 from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: refreshes are only serialised per process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
 
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "question_papers.db")
 
+# Read-only copy of DB_PATH that public routes read from when
+# PAPERVAULT_READ_SNAPSHOT=1. get_db() refreshes it after every commit that
+# changed rows.
+SNAPSHOT_PATH = DB_PATH + ".snapshot"
+SNAPSHOT_ENABLED = os.environ.get("PAPERVAULT_READ_SNAPSHOT", "").lower() in ("1", "true", "yes")
+SNAPSHOT_MMAP_SIZE = 256 * 1024 * 1024
+SNAPSHOT_LOCK_PATH = SNAPSHOT_PATH + ".lock"
+_snapshot_lock = threading.Lock()
+
 # Dummy subjects by semester (common across branches for demo)
 SEMESTER_SUBJECTS = {
     1: ["Engineering Mathematics-I", "Engineering Physics", "Engineering Chemistry", "Basic Electrical Engineering", "Programming in C"],
@@ -36,10 +56,70 @@ def get_db():
     try:
         yield conn
         conn.commit()
+        changed = conn.total_changes > 0
+    finally:
+        conn.close()
+    if changed:
+        refresh_snapshot()
+
+
+@contextmanager
+def get_read_db():
+    """Connection for public read-only queries.
+
+    With snapshot mode on, opens SNAPSHOT_PATH as immutable and memory-mapped
+    so readers never take locks against admin writes; otherwise (or before the
+    first snapshot exists) this is the same as get_db().
+    """
+    if not SNAPSHOT_ENABLED or not os.path.exists(SNAPSHOT_PATH):
+        with get_db() as conn:
+            yield conn
+        return
+    conn = sqlite3.connect(Path(SNAPSHOT_PATH).as_uri() + "?mode=ro&immutable=1", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute(f"PRAGMA mmap_size = {SNAPSHOT_MMAP_SIZE}")
+        yield conn
     finally:
         conn.close()
 
 
+def refresh_snapshot():
+    """Copy DB_PATH to SNAPSHOT_PATH with the backup API and swap it in atomically.
+
+    Connections already open on the old snapshot keep reading it until they
+    close. Refreshes are serialised across threads and, via an flock on
+    SNAPSHOT_LOCK_PATH, across worker processes, so an older copy never
+    replaces a newer one. Errors are logged and the previous snapshot stays
+    in place, since the write that triggered the refresh has already been
+    committed. No-op unless snapshot mode is on.
+    """
+    if not SNAPSHOT_ENABLED:
+        return
+    tmp_path = None
+    try:
+        with _snapshot_lock, open(SNAPSHOT_LOCK_PATH, "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(SNAPSHOT_PATH), suffix=".snapshot.tmp")
+            os.close(fd)
+            src = sqlite3.connect(DB_PATH)
+            try:
+                dst = sqlite3.connect(tmp_path)
+                try:
+                    src.backup(dst)
+                finally:
+                    dst.close()
+            finally:
+                src.close()
+            os.replace(tmp_path, SNAPSHOT_PATH)
+    except Exception:
+        logger.exception("Could not refresh read snapshot")
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def init_db():
     """Create tables and seed initial data."""
     with get_db() as conn:
@@ -0,0 +1,220 @@
+"""Paper storage: keeps PDF files in PDF_FOLDER and question_papers rows in step."""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+from werkzeug.utils import secure_filename
+
+import database as db
+
+PDF_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdf")
+
+# Partially written uploads and files whose row is being deleted. Both are
+# dot-prefixed so they never collide with a slugified paper filename.
+TMP_SUFFIX = ".tmp"
+TOMBSTONE_SUFFIX = ".deleted"
+
+# fsck leaves scratch files and unreferenced PDFs younger than this alone
+# (an upload or delete may still be in flight)
+STALE_TMP_SECONDS = 3600
+
+
+def _is_scratch(name):
+    return name.startswith(".") and (name.endswith(TMP_SUFFIX) or name.endswith(TOMBSTONE_SUFFIX))
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def save_paper(file, branch_id, semester_id, subject_id, academic_year, description=None):
+    """Store an uploaded PDF and insert its row in one transaction.
+
+    The upload is written to a temp file first and renamed into place once
+    the row has been inserted. Re-uploads share a filename, so the file being
+    replaced is kept as a hard-linked backup until the commit succeeds and is
+    restored if it fails. Raises ValueError for an unknown
+    branch/semester/subject. Returns the stored filename.
+    """
+    tmp_path = os.path.join(PDF_FOLDER, f".{uuid.uuid4().hex}{TMP_SUFFIX}")
+    displaced = None
+    try:
+        with open(tmp_path, "wb") as out:
+            file.save(out)
+            out.flush()
+            os.fsync(out.fileno())
+        with db.get_db() as conn:
+            c = conn.cursor()
+            c.execute("SELECT name FROM branches WHERE id = ?", (branch_id,))
+            br = c.fetchone()
+            c.execute("SELECT number FROM semesters WHERE id = ?", (semester_id,))
+            sem = c.fetchone()
+            c.execute("SELECT name FROM subjects WHERE id = ?", (subject_id,))
+            sub = c.fetchone()
+            if not br or not sem or not sub:
+                raise ValueError("Invalid branch/semester/subject")
+            filename = secure_filename(
+                f"{db.slugify(br['name'])}_{sem['number']}_{db.slugify(sub['name'])}_{academic_year}.pdf"
+            )
+            c.execute(
+                "INSERT INTO question_papers (branch_id, semester_id, subject_id, academic_year, file_path, description) VALUES (?, ?, ?, ?, ?, ?)",
+                (branch_id, semester_id, subject_id, academic_year, filename, description or None),
+            )
+            final = os.path.join(PDF_FOLDER, filename)
+            if os.path.isfile(final):
+                displaced = os.path.join(PDF_FOLDER, f".{uuid.uuid4().hex}{TMP_SUFFIX}")
+                os.link(final, displaced)
+                os.utime(displaced)
+            os.replace(tmp_path, final)
+            try:
+                conn.commit()
+            except Exception:
+                if displaced:
+                    os.replace(displaced, final)
+                else:
+                    _unlink(final)
+                raise
+    finally:
+        _unlink(tmp_path)
+        if displaced:
+            _unlink(displaced)
+    return filename
+
+
+def delete_paper(paper_id):
+    """Delete a paper row and its PDF. Returns False if the paper does not exist.
+
+    The PDF is first renamed to a tombstone, the row is deleted and committed,
+    and only then is the tombstone unlinked. If the delete fails the tombstone
+    is renamed back; if the final unlink fails, fsck purges it later.
+    """
+    tombstone = None
+    with db.get_db() as conn:
+        c = conn.cursor()
+        # Take the write lock up front so a concurrent re-upload of the same
+        # filename cannot land between the checks below and the rename.
+        c.execute("BEGIN IMMEDIATE")
+        c.execute("SELECT file_path FROM question_papers WHERE id = ?", (paper_id,))
+        row = c.fetchone()
+        if not row:
+            return False
+        # Re-uploads for the same subject/year share a filename; keep the file
+        # while another row still points at it.
+        c.execute(
+            "SELECT 1 FROM question_papers WHERE file_path = ? AND id != ? LIMIT 1",
+            (row["file_path"], paper_id),
+        )
+        shared = c.fetchone() is not None
+        path = os.path.join(PDF_FOLDER, row["file_path"])
+        if not shared and os.path.isfile(path):
+            tombstone = os.path.join(PDF_FOLDER, f".{paper_id}_{row['file_path']}{TOMBSTONE_SUFFIX}")
+            os.replace(path, tombstone)
+            # rename keeps the PDF's old mtime; fsck ages tombstones by mtime
+            os.utime(tombstone)
+        try:
+            c.execute("DELETE FROM question_papers WHERE id = ?", (paper_id,))
+            conn.commit()
+        except Exception:
+            if tombstone:
+                os.replace(tombstone, path)
+            raise
+    if tombstone:
+        try:
+            os.remove(tombstone)
+        except OSError:
+            pass
+    return True
+
+
+def _is_stale_orphan(conn, name, now):
+    try:
+        mtime = os.stat(os.path.join(PDF_FOLDER, name)).st_mtime
+    except FileNotFoundError:
+        return False
+    if now - mtime <= STALE_TMP_SECONDS:
+        return False
+    row = conn.execute("SELECT 1 FROM question_papers WHERE file_path = ? LIMIT 1", (name,)).fetchone()
+    return row is None
+
+
+def fsck(repair=False):
+    """Reconcile PDF_FOLDER against question_papers.
+
+    Lists the folder once, then streams the table once, so the cost is a
+    single pass over each side. Returns a dict with:
+      missing  - (id, file_path) rows whose PDF does not exist
+      orphans  - PDFs that no row references
+      scratch  - leftover temp files and tombstones
+    Scratch files and orphans younger than STALE_TMP_SECONDS are skipped, as
+    they may belong to an upload or delete still in progress. With
+    repair=True, missing rows are deleted and orphans and scratch files are
+    removed; rows and orphans are re-checked under the write lock first, so
+    an upload that committed after the folder was listed is left alone.
+    """
+    files = {}
+    scratch = []
+    now = time.time()
+    with os.scandir(PDF_FOLDER) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            try:
+                stale = now - entry.stat().st_mtime > STALE_TMP_SECONDS
+            except FileNotFoundError:
+                continue
+            if _is_scratch(entry.name):
+                if stale:
+                    scratch.append(entry.name)
+            elif entry.name.lower().endswith(".pdf"):
+                files[entry.name] = stale
+
+    missing = []
+    referenced = set()
+    with db.get_db() as conn:
+        for r in conn.execute("SELECT id, file_path FROM question_papers"):
+            name = r["file_path"]
+            if name in files:
+                referenced.add(name)
+            else:
+                missing.append((r["id"], name))
+        orphans = sorted(name for name, stale in files.items() if stale and name not in referenced)
+        if repair and (missing or orphans):
+            # save_paper/delete_paper rename files while holding this lock
+            conn.execute("BEGIN IMMEDIATE")
+            missing = [(pid, name) for pid, name in missing if not os.path.exists(os.path.join(PDF_FOLDER, name))]
+            conn.executemany("DELETE FROM question_papers WHERE id = ?", [(pid,) for pid, _ in missing])
+            orphans = [name for name in orphans if _is_stale_orphan(conn, name, now)]
+            for name in orphans:
+                _unlink(os.path.join(PDF_FOLDER, name))
+
+    if repair:
+        for name in scratch:
+            _unlink(os.path.join(PDF_FOLDER, name))
+    return {"missing": missing, "orphans": orphans, "scratch": sorted(scratch)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check pdf/ against the question_papers table.")
+    parser.add_argument("command", choices=["fsck"])
+    parser.add_argument("--repair", action="store_true", help="drop dangling rows and delete orphan/scratch files")
+    args = parser.parse_args(argv)
+    result = fsck(repair=args.repair)
+    for pid, name in result["missing"]:
+        print(f"missing file for paper {pid}: {name}")
+    for name in result["orphans"]:
+        print(f"orphan file: {name}")
+    for name in result["scratch"]:
+        print(f"stale scratch file: {name}")
+    problems = sum(len(v) for v in result.values())
+    print(f"{problems} problem(s) found" + (", repaired" if args.repair and problems else ""))
+    return 1 if problems and not args.repair else 0
+
+
+if __name__ == "__main__":
+    os.makedirs(PDF_FOLDER, exist_ok=True)
+    sys.exit(main())